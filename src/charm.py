@@ -4,13 +4,15 @@
 
 """Go Charm entrypoint."""
 
+import dataclasses
+import functools
+import hashlib
 import json
 import logging
 import typing
 from enum import Enum
 
 import ops
-import requests
 from charms.data_platform_libs.v0.data_interfaces import (
     DatabaseCreatedEvent,
     DatabaseEndpointsChangedEvent,
@@ -21,7 +23,10 @@ from charms.nginx_ingress_integrator.v0.nginx_route import require_nginx_route
 from charms.prometheus_k8s.v0.prometheus_scrape import MetricsEndpointProvider
 from charms.rolling_ops.v0.rollingops import RollingOpsManager
 
-from database import DatabaseHandler
+from database import DatabaseHandler, DBData
+
+if typing.TYPE_CHECKING:
+    import requests
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +44,10 @@ REPORTS_CACHE_NAME = "reports-cache"
 
 WEB_ALLOWLIST_PATH = "/etc/ubuntu-insights-service/web-allowlist.json"
 INGEST_ALLOWLIST_PATH = "/etc/ubuntu-insights-service/ingest-allowlist.json"
+ALLOWLIST_PATHS = {
+    ServiceType.WEB: WEB_ALLOWLIST_PATH,
+    ServiceType.INGEST: INGEST_ALLOWLIST_PATH,
+}
 INGEST_DATABASE_NAME = "insights"
 
 WEB_PROMETHEUS_PORT = 2112
@@ -48,7 +57,8 @@ DATABASE_RELATION_NAME = "database"
 
 MIGRATIONS_PATH = "/usr/share/insights/migrations"
 
-LEGACY_VERSIONS = {
+# Kept in order so that the rendered allowlists are byte-stable across hooks.
+LEGACY_VERSIONS: tuple[str, ...] = (
     "18.04",
     "18.10",
     "20.04",
@@ -64,14 +74,48 @@ LEGACY_VERSIONS = {
     "25.04",
     "25.10",
     "26.04",
-}
+)
+
+LEGACY_ALLOWLIST_ENTRIES = tuple(
+    f"ubuntu-report/ubuntu/desktop/{version}" for version in LEGACY_VERSIONS
+)
+
+# Charm config, either the live ConfigData or a snapshot of it taken for one reconcile.
+_Config = typing.Mapping[str, bool | int | float | str]
+
+
+# Fields of the layer's services and checks that the charm sets.
+_OWNED_LAYER_FIELDS = ("summary", "command", "startup", "environment", "level", "http")
+
+
+def _owned_fields_match(
+    wanted: typing.Mapping[str, object], current: typing.Mapping[str, object]
+) -> bool:
+    """Check if the fields the charm sets on a layer entry match the plan.
+
+    Empty fields are left out of the dicts, so a missing field is treated as empty. A field
+    removed from the layer is therefore detected, as the entries replace the plan's.
+    """
+    return all(
+        (wanted.get(field) or None) == (current.get(field) or None)
+        for field in _OWNED_LAYER_FIELDS
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class _LayerInputs:
+    """Workload state the Pebble layer is built from, gathered once per build."""
+
+    report_cache_path: str
+    web_rendered: bool
+    ingest_rendered: bool
+    db_data: DBData
 
 
 class UbuntuInsightsCharm(ops.CharmBase):
     """Go Charm service."""
 
-    web_apps: list[str] = []
-    ingest_apps: list[str] = []
+    _stored = ops.StoredState()
 
     def __init__(self, *args: typing.Any) -> None:
         """Initialize the instance.
@@ -82,6 +126,38 @@ class UbuntuInsightsCharm(ops.CharmBase):
         super().__init__(*args)
 
         self.container = self.unit.get_container(CONTAINER_NAME)
+        self._pebble_reachable = False
+        self._stored.set_default(last_migration_token="")
+        self.web_apps: tuple[str, ...] = ()
+        self.ingest_apps: tuple[str, ...] = ()
+        # Parsed app lists, keyed by the raw comma-separated config value.
+        self._parsed_apps: dict[str, tuple[str, ...]] = {}
+
+        # Charm metadata is immutable, resolve the container mounts once.
+        self._container_meta = self.framework.meta.containers.get(CONTAINER_NAME, None)
+        self._report_cache_path = self._resolve_report_cache_path()
+
+        # Allowlist contents last pushed to the workload, keyed by path.
+        self._pushed_allowlists: dict[str, str] = {}
+        # Allowlist paths known to exist in the workload container.
+        self._rendered_allowlists: set[str] = set()
+
+        # Last built Pebble layer and service commands, the inputs they were built from,
+        # and the last layer applied.
+        self._layer_key: tuple | None = None
+        self._layer: ops.pebble.Layer | None = None
+        self._applied_layer: ops.pebble.Layer | None = None
+        self._commands_key: tuple | None = None
+        self._commands: tuple[str, str] | None = None
+
+        # Workload version, cached until the web service command changes, and the version
+        # last reported to Juju.
+        self._cached_version = ""
+        self._version_command: str | None = None
+        self._workload_version: str | None = None
+
+        # Inputs of the last successful reconcile, see _reconcile.
+        self._last_reconcile_sig: int | None = None
 
         self.framework.observe(self.on.start, self._on_pebble_ready)
         self.framework.observe(self.on.upgrade_charm, self._on_upgrade_charm)
@@ -102,7 +178,7 @@ class UbuntuInsightsCharm(ops.CharmBase):
         # The 'relation_name' comes from the 'charmcraft.yaml file'.
         self._database = DatabaseHandler(self, DATABASE_RELATION_NAME)
 
-        self._require_nginx_route()
+        self._require_nginx_route(self.config)
 
     def _init_events(self):
         self.framework.observe(
@@ -152,19 +228,19 @@ class UbuntuInsightsCharm(ops.CharmBase):
             # We need the charms to finish integrating.
             event.add_status(ops.WaitingStatus("Waiting for database relation"))
 
-        container_meta = self.framework.meta.containers.get(CONTAINER_NAME, None)
-        if container_meta is None:
+        if self._container_meta is None:
             event.add_status(ops.BlockedStatus("Container metadata not found"))
-        elif (
-            REPORTS_CACHE_NAME not in container_meta.mounts
-            or not container_meta.mounts[REPORTS_CACHE_NAME].location
-        ):
+        elif not self.report_cache_path:
             event.add_status(ops.BlockedStatus("Waiting for reports cache storage mount"))
 
         try:
-            web_status = self.container.get_service(ServiceType.WEB.value)
-            ingest_status = self.container.get_service(ServiceType.INGEST.value)
+            services = self.container.get_services(ServiceType.WEB.value, ServiceType.INGEST.value)
         except (ops.pebble.APIError, ops.pebble.ConnectionError, ops.ModelError):
+            services = None
+
+        web_status = services.get(ServiceType.WEB.value) if services else None
+        ingest_status = services.get(ServiceType.INGEST.value) if services else None
+        if web_status is None or ingest_status is None:
             event.add_status(ops.MaintenanceStatus("Waiting for Pebble in workload container"))
         else:
             if not web_status.is_running():
@@ -177,8 +253,8 @@ class UbuntuInsightsCharm(ops.CharmBase):
 
         event.add_status(ops.ActiveStatus())
 
-    def _on_pebble_ready(self, event: ops.PebbleReadyEvent) -> None:
-        self._on_config_changed(event)
+    def _on_pebble_ready(self, _: ops.EventBase) -> None:
+        self._reconcile(force=True)
 
     def _on_upgrade_charm(self, _: ops.EventBase) -> None:
         """Handle charm upgrade events."""
@@ -187,35 +263,84 @@ class UbuntuInsightsCharm(ops.CharmBase):
 
     def _on_config_changed(self, _: ops.EventBase) -> None:
         """Handle configuration changes."""
-        self.web_apps = [item.strip() for item in str(self.config["web-apps"]).split(",")]
-        self.ingest_apps = [item.strip() for item in str(self.config["ingest-apps"]).split(",")]
+        self._reconcile()
+
+    def _reconcile_signature(self, config: _Config) -> int:
+        """Hash of every input that affects the rendered workload configuration."""
+        return hash(
+            (
+                tuple(sorted(config.items())),
+                dataclasses.astuple(self._database.get_relation_data()),
+                self.report_cache_path,
+            )
+        )
+
+    def _reconcile(self, force: bool = False) -> None:
+        """Render the workload configuration and apply it.
+
+        The reconcile is skipped if its inputs have not changed since the last successful
+        one, unless forced.
+
+        Args:
+            force: Reconcile even if the inputs are unchanged.
+        """
+        # Snapshot the config once, ConfigData looks each key up again on every access.
+        config = dict(self.config)
+        signature = self._reconcile_signature(config)
+        if not force and signature == self._last_reconcile_sig:
+            logger.debug("Configuration is unchanged since the last reconcile, skipping.")
+            return
+
+        self.web_apps = self._parse_apps(str(config["web-apps"]))
+        self.ingest_apps = self._parse_apps(str(config["ingest-apps"]))
 
         # Write allowlist config files for web and ingest services.
-        self._render_allowlist(ServiceType.WEB)
-        self._render_allowlist(ServiceType.INGEST)
+        allowlists_changed = self._push_allowlists(
+            [
+                self._build_allowlist(ServiceType.WEB, config),
+                self._build_allowlist(ServiceType.INGEST, config),
+            ]
+        )
 
         # Migrate the database if the database relation is created.
-        if self.config["migrate"]:
+        if config["migrate"]:
             self._execute_migrations()
 
         # Expose web service port
-        self.unit.set_ports(typing.cast(int, self.config["web-port"]))
+        self.unit.set_ports(typing.cast(int, config["web-port"]))
 
         # Update nginx route config
-        self._require_nginx_route()
+        self._require_nginx_route(config)
 
-        # Restart the services to apply the new configurations.
-        self._update_layer_and_replan()
+        # Restart the services to apply the new configurations, if anything changed.
+        layer = self._build_pebble_layer(self._layer_inputs(), config)
+        if self._update_layer_and_replan(layer, force=allowlists_changed):
+            self._last_reconcile_sig = signature
+
+    def _parse_apps(self, raw: str) -> tuple[str, ...]:
+        """Split a comma-separated list of applications, memoized by the raw value."""
+        apps = self._parsed_apps.get(raw)
+        if apps is None:
+            apps = self._parsed_apps[raw] = tuple(item.strip() for item in raw.split(","))
+        return apps
 
     @property
     def ingest_environment(self) -> dict[str, str]:
         """Environment variables for the ingest service."""
-        key_prefix = "UBUNTU_INSIGHTS_INGEST_SERVICE_"
-        if not self._database.is_relation_ready():
-            return {}
+        return self._build_ingest_environment(self._database.get_relation_data())
+
+    @staticmethod
+    def _build_ingest_environment(db_data: DBData) -> dict[str, str]:
+        """Build the ingest service environment variables from the database relation data.
 
-        db_data = self._database.get_relation_data()
-        if not db_data:
+        Args:
+            db_data: The database relation data.
+
+        Returns:
+            The environment variables, or an empty dict if the relation is not ready.
+        """
+        key_prefix = "UBUNTU_INSIGHTS_INGEST_SERVICE_"
+        if not db_data.host:
             return {}
 
         return {
@@ -230,10 +355,18 @@ class UbuntuInsightsCharm(ops.CharmBase):
     def report_cache_path(self) -> str:
         """Path to the reports cache directory.
 
+        If the reports cache mount or container metadata is not found,
+        an empty string is returned.
+        """
+        return self._report_cache_path
+
+    def _resolve_report_cache_path(self) -> str:
+        """Resolve the reports cache directory from the container metadata.
+
         If the reports cache mount or container metadata is not found,
         an error is logged and an empty string is returned.
         """
-        container_meta = self.framework.meta.containers.get(CONTAINER_NAME, None)
+        container_meta = self._container_meta
         if container_meta is None:
             logger.error("Failed to get container metadata for %s", CONTAINER_NAME)
             return ""
@@ -246,95 +379,222 @@ class UbuntuInsightsCharm(ops.CharmBase):
 
     def _on_database_created(self, _: DatabaseCreatedEvent) -> None:
         self._execute_migrations()
-        self._update_layer_and_replan()
+        self._reconcile()
 
     def _on_database_endpoints_changed(self, _: DatabaseEndpointsChangedEvent) -> None:
         self._execute_migrations()
-        self._update_layer_and_replan()
+        self._reconcile()
 
     def _on_database_relation_broken(self, _: ops.RelationBrokenEvent) -> None:
         """Handle the database relation being broken."""
         self._stop_service(ServiceType.INGEST)
 
-    def _on_restart(self, event: ops.EventBase) -> None:
+    def _on_restart(self, _: ops.EventBase) -> None:
         """Handle rolling restart requests."""
-        self._on_config_changed(event)
+        self._reconcile(force=True)
+
+    def _update_layer_and_replan(self, layer: ops.pebble.Layer, force: bool = False) -> bool:
+        """Apply the Pebble layer and replan the services.
+
+        Nothing is sent to Pebble if the layer was already applied in this hook or, unless
+        forced, if the current plan already matches it.
+
+        Args:
+            layer: The layer to apply.
+            force: Replan even if the current plan already matches the layer.
 
-    def _update_layer_and_replan(self) -> None:
+        Returns:
+            True if the layer is applied, False if Pebble could not be reached.
+        """
         ops.MaintenanceStatus("Assembling Pebble layers")
+        if layer is self._applied_layer:
+            logger.debug("Pebble layer '%s' is unchanged, skipping replan.", self.container.name)
+            return True
+
+        if not force and self._is_plan_current(layer):
+            logger.info("Pebble plan unchanged, skipping replan.")
+            self._applied_layer = layer
+            # An earlier hook may have failed to fetch the version, report it again.
+            self._report_workload_version(layer)
+            return True
+
         try:
-            self.container.add_layer(self.container.name, self._pebble_layer, combine=True)
+            self.container.add_layer(self.container.name, layer, combine=True)
             logger.info(f"Added updated layer '{self.container.name}' to Pebble plan.")
 
             self.container.pebble.replan_services()
             logger.info(f"Replanned Pebble container '{self.container.name}'.")
         except (ops.pebble.APIError, ops.pebble.ConnectionError) as e:
             logger.info("Unable to connect to Pebble: %s", e)
-            return
+            return False
+
+        self._applied_layer = layer
+        self._report_workload_version(layer)
+        return True
+
+    def _report_workload_version(self, layer: ops.pebble.Layer) -> None:
+        """Report the workload version to Juju if it changed since it was last reported.
+
+        Args:
+            layer: The layer the services are running with.
+        """
+        web_command = layer.services[ServiceType.WEB.value].command
+        if web_command != self._version_command:
+            self._version_command = web_command
+            self._cached_version = ""
+
+        version = self.version
+        if version != self._workload_version:
+            self.unit.set_workload_version(version)
+            self._workload_version = version
 
-        self.unit.set_workload_version(self.version)
+    def _is_plan_current(self, layer: ops.pebble.Layer) -> bool:
+        """Check if the Pebble plan already matches the layer and its services are running.
 
-    def _require_nginx_route(self) -> None:
+        Args:
+            layer: The layer the plan is compared against.
+
+        Returns:
+            True if replanning with the layer would be a no-op, False otherwise.
+        """
+        try:
+            plan = self.container.get_plan()
+            services = self.container.get_services(*layer.services)
+        except (ops.pebble.APIError, ops.pebble.ConnectionError):
+            return False
+
+        for name, wanted in layer.services.items():
+            current = plan.services.get(name)
+            if current is None or not _owned_fields_match(wanted.to_dict(), current.to_dict()):
+                return False
+            if wanted.startup == "enabled" and not (
+                name in services and services[name].is_running()
+            ):
+                return False
+
+        for name, wanted in layer.checks.items():
+            current = plan.checks.get(name)
+            if current is None or not _owned_fields_match(wanted.to_dict(), current.to_dict()):
+                return False
+
+        return True
+
+    def _require_nginx_route(self, config: _Config) -> None:
         require_nginx_route(
             charm=self,
-            service_hostname=str(self.config["external-hostname"]) or self.app.name,
+            service_hostname=str(config["external-hostname"]) or self.app.name,
             service_name=self.app.name,
-            service_port=int(self.config["web-port"]),
+            service_port=int(config["web-port"]),
             max_body_size=1,
         )
 
-    def _render_allowlist(self, service_type: ServiceType) -> None:
-        """Write the allowlist configuration file for the specified service.
+    def _build_allowlist(self, service_type: ServiceType, config: _Config) -> tuple[str, str]:
+        """Render the allowlist configuration file for the specified service.
 
         Args:
-            service_type: ServiceType enum specifying which service config to write.
+            service_type: ServiceType enum specifying which service config to render.
+            config: The charm config.
+
+        Returns:
+            A tuple of the config file path and its JSON content.
         """
+        config_path = ALLOWLIST_PATHS[service_type]
         if service_type == ServiceType.WEB:
-            config_path = WEB_ALLOWLIST_PATH
-            legacy = self.config["web-legacy"]
+            legacy = config["web-legacy"]
             allowlist = self.web_apps
         elif service_type == ServiceType.INGEST:
-            config_path = INGEST_ALLOWLIST_PATH
             allowlist = self.ingest_apps
-            legacy = self.config["ingest-legacy"]
+            legacy = config["ingest-legacy"]
 
         if legacy:
-            allowlist = allowlist.copy()  # Make sure the original list is not modified
-            allowlist.extend(
-                f"ubuntu-report/ubuntu/desktop/{version}" for version in LEGACY_VERSIONS
-            )
+            allowlist = [*allowlist, *LEGACY_ALLOWLIST_ENTRIES]
 
-        allowlist_data = {"allowList": allowlist}
+        allowlist_json = json.dumps(
+            {"allowList": allowlist}, separators=(",", ":"), sort_keys=True
+        )
+        return config_path, allowlist_json
 
-        try:
-            allowlist_json = json.dumps(allowlist_data, indent=2)
-            self.container.push(config_path, allowlist_json, make_dirs=True)
-            logger.info(
-                "Written allowlist config for %s service to %s", service_type.value, config_path
-            )
-        except (ops.pebble.APIError, ops.pebble.ConnectionError) as e:
-            logger.error("Failed to write config file %s: %s", config_path, e)
+    def _push_allowlists(self, allowlists: list[tuple[str, str]]) -> bool:
+        """Write the rendered allowlist configuration files to the workload container.
+
+        Files whose content is unchanged, either since the last push or on disk, are
+        skipped, and the remaining pushes are abandoned as soon as Pebble is unreachable.
+
+        The push cache only lives as long as the charm instance, that is one hook, so the
+        first reconcile of every hook pulls each file to compare it. When a file did change,
+        this costs one extra Pebble call on top of the push. The pull is kept because the
+        workload filesystem does not survive a pod restart, so a cache kept across hooks
+        could not be trusted.
+
+        Args:
+            allowlists: Tuples of config file path and JSON content, from _build_allowlist.
+
+        Returns:
+            True if any allowlist was written, False otherwise.
+        """
+        changed = False
+        for config_path, allowlist_json in allowlists:
+            if self._pushed_allowlists.get(config_path) == allowlist_json:
+                logger.debug("Allowlist config %s is unchanged, skipping push", config_path)
+                continue
+
+            try:
+                with self.container.pull(config_path) as existing_file:
+                    existing = existing_file.read()
+            except (ops.pebble.PathError, ops.pebble.APIError, ops.pebble.ConnectionError):
+                existing = None
+
+            if existing == allowlist_json:
+                logger.debug("Allowlist config %s is up to date, skipping push", config_path)
+                self._pushed_allowlists[config_path] = allowlist_json
+                self._rendered_allowlists.add(config_path)
+                continue
+
+            try:
+                self.container.push(config_path, allowlist_json, make_dirs=True)
+            except ops.pebble.ConnectionError as e:
+                logger.error("Failed to write config file %s: %s", config_path, e)
+                return changed
+            except ops.pebble.APIError as e:
+                logger.error("Failed to write config file %s: %s", config_path, e)
+                continue
+
+            self._pushed_allowlists[config_path] = allowlist_json
+            self._rendered_allowlists.add(config_path)
+            logger.info("Written allowlist config to %s", config_path)
+            changed = True
+
+        return changed
 
     def _is_allowlist_rendered(self, service_type: ServiceType) -> bool:
         """Check if the allowlist configuration is ready for the specified service.
 
+        Once an allowlist is known to exist, it is not checked in the container again.
+
         Args:
             service_type: ServiceType enum specifying which service to check.
 
         Returns:
             True if the allowlist configuration is ready, False otherwise.
         """
-        match service_type:
-            case ServiceType.WEB:
-                config_path = WEB_ALLOWLIST_PATH
-            case ServiceType.INGEST:
-                config_path = INGEST_ALLOWLIST_PATH
-
-        return self.container.can_connect() and self.container.exists(config_path)
-
-    def _on_storage_state_changed(self, event: ops.StorageEvent) -> None:
+        config_path = ALLOWLIST_PATHS[service_type]
+        if config_path in self._rendered_allowlists:
+            return True
+
+        if self._can_connect() and self.container.exists(config_path):
+            self._rendered_allowlists.add(config_path)
+            return True
+        return False
+
+    def _can_connect(self) -> bool:
+        """Check if Pebble is reachable, remembering a successful check for the hook."""
+        if not self._pebble_reachable:
+            self._pebble_reachable = self.container.can_connect()
+        return self._pebble_reachable
+
+    def _on_storage_state_changed(self, _: ops.StorageEvent) -> None:
         if self.report_cache_path:
-            self._on_config_changed(event)
+            self._reconcile()
             return
 
         # Storage is not available, stop the services.
@@ -342,58 +602,90 @@ class UbuntuInsightsCharm(ops.CharmBase):
         self._stop_service(ServiceType.WEB)
         self._stop_service(ServiceType.INGEST)
 
-    @property
-    def _pebble_layer(self) -> ops.pebble.Layer:
-        """Pebble layer for the web service."""
-        debug = "-vv" if self.config["debug"] else "-v"
+    def _service_commands(self, web_port: typing.Any, debug: str) -> tuple[str, str]:
+        """Build the web and ingest service commands.
 
-        web_command = " ".join(
-            [
-                "/bin/ubuntu-insights-web-service",
-                WEB_ALLOWLIST_PATH,
-                f"--listen-port={self.config['web-port']}",
-                f"--reports-dir={self.report_cache_path}",
-                f"--metrics-port={WEB_PROMETHEUS_PORT}",
-                "--json-logs",
-                debug,
-            ]
-        ).strip()
+        The commands are cached and only rebuilt when their inputs change.
 
-        ingest_command = " ".join(
-            [
-                "/bin/ubuntu-insights-ingest-service",
-                INGEST_ALLOWLIST_PATH,
-                f"--reports-dir={self.report_cache_path}",
-                f"--metrics-port={INGEST_PROMETHEUS_PORT}",
-                "--json-logs",
-                debug,
-            ]
-        ).strip()
+        Args:
+            web_port: The port the web service listens on.
+            debug: The verbosity flag passed to both services.
+
+        Returns:
+            A tuple of the web and ingest service commands.
+        """
+        key = (web_port, self.report_cache_path, debug)
+        if self._commands is None or key != self._commands_key:
+            reports_dir = self.report_cache_path
+            self._commands_key = key
+            self._commands = (
+                f"/bin/ubuntu-insights-web-service {WEB_ALLOWLIST_PATH} "
+                f"--listen-port={web_port} --reports-dir={reports_dir} "
+                f"--metrics-port={WEB_PROMETHEUS_PORT} --json-logs {debug}",
+                f"/bin/ubuntu-insights-ingest-service {INGEST_ALLOWLIST_PATH} "
+                f"--reports-dir={reports_dir} "
+                f"--metrics-port={INGEST_PROMETHEUS_PORT} --json-logs {debug}",
+            )
+        return self._commands
+
+    def _layer_inputs(self) -> _LayerInputs:
+        """Gather the workload state that decides which services the layer enables."""
+        return _LayerInputs(
+            report_cache_path=self.report_cache_path,
+            web_rendered=self._is_allowlist_rendered(ServiceType.WEB),
+            ingest_rendered=self._is_allowlist_rendered(ServiceType.INGEST),
+            db_data=self._database.get_relation_data(),
+        )
+
+    def _build_pebble_layer(self, inputs: _LayerInputs, config: _Config) -> ops.pebble.Layer:
+        """Pebble layer for the web and ingest services.
+
+        Args:
+            inputs: The workload state the layer is built from.
+            config: The charm config.
+        """
+        db_data = inputs.db_data
+        web_port = config["web-port"]
+        debug = "-vv" if config["debug"] else "-v"
+
+        web_command, ingest_command = self._service_commands(web_port, debug)
 
         # If the reports cache path is unavailable, disable the web and ingest services.
+        # If an allowlist has not been rendered, disable its service.
         # If the database relation is not ready, disable the ingest service.
         web_startup = ingest_startup = "enabled"
 
-        if not self._is_allowlist_rendered(ServiceType.WEB) or not self.report_cache_path:
+        if not inputs.report_cache_path:
+            web_startup = ingest_startup = "disabled"
+            logger.warning("Reports cache is not available, web and ingest services are disabled.")
+
+        if not inputs.web_rendered:
             web_startup = "disabled"
             logger.warning("Web service allowlist has not been rendered, web service is disabled.")
 
-        if not self._is_allowlist_rendered(ServiceType.INGEST) or not self.report_cache_path:
+        if not inputs.ingest_rendered:
             ingest_startup = "disabled"
             logger.warning(
                 "Ingest service allowlist has not been rendered, ingest service is disabled."
             )
 
-        if not self._database.is_relation_ready():
+        if not db_data.host:
             ingest_startup = "disabled"
             logger.warning("Database relation is not ready, ingest service is disabled.")
 
-        web_startup = "enabled" if self.report_cache_path else "disabled"
-        ingest_startup = (
-            "enabled"
-            if self.report_cache_path and self._database.is_relation_ready()
-            else "disabled"
+        ingest_environment = self._build_ingest_environment(db_data)
+        check_url = f"http://localhost:{web_port}/version"
+
+        layer_key = (
+            web_command,
+            web_startup,
+            ingest_command,
+            ingest_startup,
+            tuple(sorted(ingest_environment.items())),
+            check_url,
         )
+        if self._layer is not None and layer_key == self._layer_key:
+            return self._layer
 
         pebble_layer: ops.pebble.LayerDict = {
             "summary": f"{APP_NAME} layer",
@@ -410,40 +702,104 @@ class UbuntuInsightsCharm(ops.CharmBase):
                     "summary": "ingest service",
                     "command": ingest_command,
                     "startup": ingest_startup,
-                    "environment": self.ingest_environment,
+                    "environment": ingest_environment,
                 },
             },
             "checks": {
                 "web-service-ready": {
                     "override": "replace",
                     "level": "ready",
-                    "http": {"url": f"http://localhost:{self.config['web-port']}/version"},
+                    "http": {"url": check_url},
                 },
             },
         }
-        return ops.pebble.Layer(pebble_layer)
+
+        self._layer_key = layer_key
+        self._layer = ops.pebble.Layer(pebble_layer)
+        return self._layer
 
     @property
     def version(self) -> str:
-        """Return the current workload version via the web-service version endpoint."""
+        """Return the current workload version via the web-service version endpoint.
+
+        The version is only requested once the web service is running, and is cached until
+        the web service command changes.
+        """
+        if self._cached_version:
+            return self._cached_version
+
         try:
-            if self.container.get_services(ServiceType.WEB.value):
-                return self._request_version()
+            services = self.container.get_services(ServiceType.WEB.value)
+            web_service = services.get(ServiceType.WEB.value)
+            if web_service is not None and web_service.is_running():
+                self._cached_version = self._request_version()
         except Exception as e:
             logger.warning("Unable to get version from web service API: %s", str(e), exc_info=True)
-        return ""
+        return self._cached_version
+
+    @functools.cached_property
+    def _http_session(self) -> "requests.Session":
+        """HTTP session reused for requests to the local workload.
+
+        requests is imported here as it is slow to import and only needed once the web
+        service is running.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        return session
 
     def _request_version(self) -> str:
         """Fetch the version from the running workload using the API."""
-        resp = requests.get(f"http://localhost:{self.config['web-port']}/version", timeout=10)
+        # Short connect timeout, a service that is still starting should not stall the hook.
+        resp = self._http_session.get(
+            f"http://localhost:{self.config['web-port']}/version", timeout=(1.0, 3.0)
+        )
         return resp.json()["version"]
 
+    def _migration_token(self, db_data: DBData) -> str | None:
+        """Fingerprint of the database and the migration scripts shipped in the workload.
+
+        The scripts are identified by their names, sizes and modification times. The database
+        is identified by its endpoint and the credentials issued for it, which are new for
+        every database the charm is related to. Only a hash is returned, so no credentials
+        end up in stored state.
+
+        Returns:
+            The fingerprint, or None if the migration scripts could not be inspected.
+        """
+        try:
+            migrations = self.container.list_files(MIGRATIONS_PATH)
+        except (ops.pebble.APIError, ops.pebble.ConnectionError, ops.pebble.PathError):
+            return None
+
+        if not migrations:
+            return None
+
+        sha = hashlib.sha256()
+        for field in dataclasses.astuple(db_data):
+            sha.update(f"{field}\0".encode())
+        for migration in sorted(migrations, key=lambda info: info.path):
+            sha.update(f"{migration.path}:{migration.size}:{migration.last_modified}\0".encode())
+        return sha.hexdigest()
+
     def _execute_migrations(self) -> None:
-        """Run database migrations."""
-        if not self._database.is_relation_ready() or not self.container.can_connect():
+        """Run database migrations.
+
+        Migrations are skipped if they already succeeded against the same database with the
+        same migration scripts.
+        """
+        if not self._database.is_relation_ready() or not self._can_connect():
             logger.info("Not ready to execute migrations.")
             return
 
+        token = self._migration_token(self._database.get_relation_data())
+        if token and token == self._stored.last_migration_token:
+            logger.info("Database migrations are up to date, skipping.")
+            return
+
         self.unit.status = ops.MaintenanceStatus("Running database migrations")
         try:
             process = self.container.exec(
@@ -453,6 +809,7 @@ class UbuntuInsightsCharm(ops.CharmBase):
             )
             stdout, _ = process.wait_output()
             logger.info(stdout)
+            self._stored.last_migration_token = token or ""
         except ops.pebble.ExecError as e:
             logger.exception(
                 "Failed to run database migrations, exited with code. %d. Stderr:", e.exit_code
@@ -466,12 +823,17 @@ class UbuntuInsightsCharm(ops.CharmBase):
 
     def _stop_service(self, service: ServiceType) -> None:
         """Stop a service in the container."""
-        if (
-            self.container.can_connect()
-            and service.value in self.container.get_plan().services
-            and self.container.get_service(service.value).is_running()
-        ):
+        try:
+            running = self.container.get_service(service.value).is_running()
+        except (ops.pebble.APIError, ops.pebble.ConnectionError, ops.ModelError):
+            # Pebble is unreachable or the service is not in the plan.
+            return
+
+        if running:
             logger.info("Stopping %s service", service.value)
+            # The running services no longer match the applied layer, force the next replan.
+            self._applied_layer = None
+            self._last_reconcile_sig = None
 
             try:
                 self.container.stop(service.value)
@@ -7,7 +7,7 @@ import logging
 from dataclasses import dataclass
 
 from charms.data_platform_libs.v0.data_interfaces import DatabaseRequires
-from ops import CharmBase, Object
+from ops import CharmBase, EventBase, Object
 
 DATABASE_NAME = "insights"
 
@@ -44,14 +44,40 @@ class DatabaseHandler(Object):
             database_name=DATABASE_NAME,
         )
 
+        # Relation data is memoized for the lifetime of the hook, and dropped whenever
+        # the relation itself changes.
+        self._relation_data: DBData | None = None
+        self.framework.observe(self.database.on.database_created, self._on_relation_updated)
+        self.framework.observe(self.database.on.endpoints_changed, self._on_relation_updated)
+        self.framework.observe(
+            self._charm.on[self.relation_name].relation_changed, self._on_relation_updated
+        )
+        self.framework.observe(
+            self._charm.on[self.relation_name].relation_broken, self._on_relation_updated
+        )
+
+    def _on_relation_updated(self, _: EventBase) -> None:
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop the cached relation data so that the next read fetches it again."""
+        self._relation_data = None
+
     def get_relation_data(self) -> DBData:
         """Fetch the database relation data.
 
         If the relation is not ready or data is missing, an empty DBData instance is returned.
+        The result is cached until the relation changes.
 
         Returns:
             A DBData instance containing the database relation data.
         """
+        if self._relation_data is None:
+            self._relation_data = self._fetch_relation_data()
+        return self._relation_data
+
+    def _fetch_relation_data(self) -> DBData:
+        """Read and parse the database relation data bag."""
         if self.model.get_relation(self.relation_name) is None or len(self.database.relations) < 1:
             logger.info("Could not find database relation: %s.", self.relation_name)
             return DBData()
@@ -73,19 +99,18 @@ class DatabaseHandler(Object):
 
         logger.info("Fetched database endpoint: %s", primary_endpoint)
 
-        if None in (
-            relation_data.get("username"),
-            relation_data.get("password"),
-            relation_data.get("database"),
-        ):
+        username = relation_data.get("username")
+        password = relation_data.get("password")
+        db_name = relation_data.get("database")
+        if not (username and password and db_name):
             return DBData()
 
         return DBData(
             host=primary_endpoint[0],
             port=primary_endpoint[1],
-            user=relation_data["username"],
-            password=relation_data["password"],
-            db_name=relation_data["database"],
+            user=username,
+            password=password,
+            db_name=db_name,
         )
 
     def is_relation_ready(self) -> bool:
@@ -94,4 +119,4 @@ class DatabaseHandler(Object):
         Returns:
             bool: True if the relation is ready, False otherwise.
         """
-        return self.get_relation_data().host != ""
+        return bool(self.get_relation_data().host)
@@ -1,14 +1,65 @@
+import functools
+import hashlib
 import logging
+import re
 import subprocess
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
 import jubilant
 import pytest
+import requests
 import yaml
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+PACKED_CHARM_SUFFIX = re.compile(r"-[0-9a-f]{12}\.charm$")
+
+
+def _drops_settled_status(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a jubilant.Juju method so that calling it discards the cached settled status."""
+
+    @functools.wraps(method)
+    def wrapper(self: "StatusCachingJuju", *args: Any, **kwargs: Any) -> Any:
+        self._settled_status = None
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class StatusCachingJuju(jubilant.Juju):
+    """jubilant.Juju whose status() reuses the status returned by the last wait.
+
+    wait() always polls as usual. Its result is served by status() until the next juju
+    command of any kind, so reads right after a wait need no extra juju status.
+    """
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._settled_status: jubilant.Status | None = None
+
+    # Every other jubilant.Juju method runs its command through cli(), only exec() and run()
+    # call the juju CLI directly.
+    cli = _drops_settled_status(jubilant.Juju.cli)
+    exec = _drops_settled_status(jubilant.Juju.exec)
+    run = _drops_settled_status(jubilant.Juju.run)
+
+    def status(self) -> jubilant.Status:
+        if self._settled_status is not None:
+            return self._settled_status
+        return super().status()
+
+    def wait(self, ready: Callable[[jubilant.Status], bool], **kwargs: Any) -> jubilant.Status:
+        self._settled_status = None
+        self._settled_status = super().wait(ready, **kwargs)
+        return self._settled_status
+
+
+def pytest_collection_modifyitems(items: list[pytest.Item]):
+    """Run the removal tests last, since they tear down the deployment shared by the session."""
+    items.sort(key=lambda item: item.path.name == "test_removal.py")
+
 
 @pytest.fixture(scope="session")
 def metadata():
@@ -16,7 +67,7 @@ def metadata():
     yield yaml.safe_load(Path("./charmcraft.yaml").read_text())
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def juju(request: pytest.FixtureRequest):
     def show_debug_log(juju: jubilant.Juju):
         if request.session.testsfailed:
@@ -25,14 +76,14 @@ def juju(request: pytest.FixtureRequest):
 
     model = request.config.getoption("--model")
     if model:
-        juju = jubilant.Juju(model=model, wait_timeout=10 * 60)
+        juju = StatusCachingJuju(model=model, wait_timeout=10 * 60)
         yield juju
         show_debug_log(juju)
         return
 
     keep_models = bool(request.config.getoption("--keep-models"))
-    with jubilant.temp_model(keep=keep_models) as juju:
-        juju.wait_timeout = 10 * 60
+    with jubilant.temp_model(keep=keep_models) as temp_juju:
+        juju = StatusCachingJuju(model=temp_juju.model, wait_timeout=10 * 60)
 
         yield juju  # run the test
         show_debug_log(juju)
@@ -57,6 +108,17 @@ def charm_file(metadata: Dict[str, Any], pytestconfig: pytest.Config):
         yield charm_file
         return
 
+    app_name = metadata["name"]
+    charm_path = Path(__file__).parent.parent.parent
+    digest = _charm_sources_digest(charm_path)[:12]
+
+    # Reuse a charm packed from identical sources by a previous run.
+    cached = [p.absolute() for p in charm_path.glob(f"{app_name}*-{digest}.charm")]
+    if cached:
+        logger.debug(f"Reusing charm file packed from the same sources: {cached[0]}")
+        yield str(cached[0])
+        return
+
     try:
         subprocess.run(["charmcraft", "pack"], check=True, capture_output=True, text=True)
     except FileNotFoundError:
@@ -64,18 +126,46 @@ def charm_file(metadata: Dict[str, Any], pytestconfig: pytest.Config):
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"Failed to pack charm: {exec}; Stderr: \n{e.stderr}") from None
 
-    app_name = metadata["name"]
-    charm_path = Path(__file__).parent.parent.parent
     logger.debug(f"Looking for {app_name} .charm file in {charm_path}")
 
-    charms = [p.absolute() for p in charm_path.glob(f"{app_name}*.charm")]
+    # Charms from earlier runs carry a digest suffix, the freshly packed one does not.
+    charms = [
+        p.absolute()
+        for p in charm_path.glob(f"{app_name}*.charm")
+        if not PACKED_CHARM_SUFFIX.search(p.name)
+    ]
     assert charms, f"{app_name} .charm file not found in {charm_path}"
     assert len(charms) == 1, f"{app_name} .charm file not unique, unsure which to use"
-    logger.debug(f"Found charm file: {charms[0]}")
-    yield str(charms[0])
 
+    # Only the charm for the current sources is kept, drop the ones packed from older sources.
+    for stale in charm_path.glob(f"{app_name}*.charm"):
+        if PACKED_CHARM_SUFFIX.search(stale.name):
+            logger.debug(f"Removing charm file packed from older sources: {stale}")
+            stale.unlink()
+
+    charm = charms[0].rename(charms[0].with_name(f"{charms[0].stem}-{digest}.charm"))
+    logger.debug(f"Found charm file: {charm}")
+    yield str(charm)
+
+
+def _charm_sources_digest(root: Path) -> str:
+    """Hash every source file that goes into the packed charm."""
+    patterns = ("src/**/*", "lib/**/*", "charmcraft.yaml", "pyproject.toml", "uv.lock")
+    paths = sorted(
+        path
+        for pattern in patterns
+        for path in root.glob(pattern)
+        if path.is_file() and "__pycache__" not in path.parts
+    )
 
-@pytest.fixture(scope="module")
+    sha = hashlib.sha256()
+    for path in paths:
+        sha.update(str(path.relative_to(root)).encode())
+        sha.update(path.read_bytes())
+    return sha.hexdigest()
+
+
+@pytest.fixture(scope="session")
 def app(juju: jubilant.Juju, metadata: Dict[str, Any], charm_file: str, image: str):
     app_name = metadata["name"]
 
@@ -116,7 +206,7 @@ def app(juju: jubilant.Juju, metadata: Dict[str, Any], charm_file: str, image: s
     yield app_name
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def insights_address(app: str, juju: jubilant.Juju):
     """Fixture to get the address of the Ubuntu Insights web service."""
     port = juju.config(app)["web-port"]
@@ -127,6 +217,14 @@ def insights_address(app: str, juju: jubilant.Juju):
     return f"http://{app_ip}:{port}"
 
 
+@pytest.fixture(scope="session")
+def http(insights_address: str):
+    """Fixture to provide a keep-alive HTTP session for the Ubuntu Insights web service."""
+    with requests.Session() as session:
+        session.mount(insights_address, HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        yield session
+
+
 @pytest.fixture(scope="session")
 def requests_timeout():
     """Fixture to provide a global timeout for HTTP requests."""
@@ -3,11 +3,12 @@
 # See LICENSE file for licensing details.
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import jubilant
 import requests
 
-from tests.integration.helpers import ExampleReport
+from tests.integration.helpers import ExampleReport, Report
 
 logger = logging.getLogger(__name__)
 
@@ -22,67 +23,73 @@ def test_active(juju: jubilant.Juju, app: str):
     assert status.apps[app].units[app + "/1"].is_active
 
 
-def test_web_service_running(insights_address: str, requests_timeout: float):
-    """Check that the web service is running.
-
-    Ensure that it is responding to HTTP requests in an expected manner.
-    """
-    response = requests.get(f"{insights_address}/version", timeout=requests_timeout)
-    assert response.status_code == 200
+JSON_HEADERS = {"Content-Type": "application/json"}
 
-    response = requests.post(
-        f"{insights_address}/upload/linux",
-        json=ExampleReport.BASIC.value,
-        timeout=requests_timeout,
-    )
-    assert response.status_code == 202
+# HTTP checks inside juju.wait predicates run on every Nth poll, with a short timeout so a hung
+# request does not stall the wait loop.
+HTTP_POLL_EVERY = 3
+HTTP_POLL_TIMEOUT = 2.0
+# Consecutive passing HTTP probes required, matching the default successes of juju.wait.
+HTTP_POLL_SUCCESSES = 3
 
-    response = requests.post(
-        f"{insights_address}/upload/linux",
-        json=ExampleReport.OPT_OUT.value,
-        timeout=requests_timeout,
-    )
-    assert response.status_code == 202
+EXTRA_FIELD_REPORT = Report({**ExampleReport.BASIC.value, "extra_field": "extra_value"})
 
-    response = requests.post(
-        f"{insights_address}/upload/ubuntu_desktop_provision",
-        json=ExampleReport.WITH_SOURCE_METRICS.value,
-        timeout=requests_timeout,
-    )
-    assert response.status_code == 202
+# Upload path, request body, and expected status code.
+UPLOAD_CASES = [
+    ("/upload/linux", ExampleReport.BASIC.bytes, 202),
+    ("/upload/linux", ExampleReport.OPT_OUT.bytes, 202),
+    ("/upload/ubuntu_desktop_provision", ExampleReport.WITH_SOURCE_METRICS.bytes, 202),
+    ("/ubuntu/desktop/20.04", ExampleReport.UBUNTU_REPORT.bytes, 200),
+    # Bad application name
+    ("/upload/bad-app", ExampleReport.BASIC.bytes, 403),
+    # Bad payload
+    ("/upload/linux", b'{"bad":}', 400),
+    # Payload with extra root fields
+    ("/upload/linux", EXTRA_FIELD_REPORT.bytes, 202),
+]
 
-    response = requests.post(
-        f"{insights_address}/ubuntu/desktop/20.04",
-        json=ExampleReport.UBUNTU_REPORT.value,
-        timeout=requests_timeout,
-    )
-    assert response.status_code == 200
 
-    # Bad application name
-    response = requests.post(
-        f"{insights_address}/upload/bad-app",
-        json=ExampleReport.BASIC.value,
-        timeout=requests_timeout,
-    )
-    assert response.status_code == 403
+def test_web_service_running(
+    http: requests.Session, insights_address: str, requests_timeout: float
+):
+    """Check that the web service is running.
 
-    # Bad payload
-    response = requests.post(
-        f"{insights_address}/upload/linux",
-        data='{"bad":}',
-        timeout=requests_timeout,
-    )
-    assert response.status_code == 400
+    Ensure that it is responding to HTTP requests in an expected manner.
+    """
+    response = http.get(f"{insights_address}/version", timeout=requests_timeout)
+    assert response.status_code == 200
 
-    # Payload with extra root fields
-    payload = ExampleReport.BASIC.value.copy()
-    payload["extra_field"] = "extra_value"
-    response = requests.post(
-        f"{insights_address}/upload/linux",
-        json=payload,
-        timeout=requests_timeout,
-    )
-    assert response.status_code == 202
+    def upload(path: str, body: bytes) -> int:
+        # requests.Session is not thread-safe, so every upload uses a session of its own.
+        with requests.Session() as session:
+            response = session.post(
+                f"{insights_address}{path}",
+                data=body,
+                headers=JSON_HEADERS,
+                timeout=requests_timeout,
+            )
+        return response.status_code
+
+    # The uploads are independent of each other, so send them concurrently.
+    with ThreadPoolExecutor(max_workers=len(UPLOAD_CASES)) as executor:
+        futures = [executor.submit(upload, path, body) for path, body, _ in UPLOAD_CASES]
+
+    for (path, _, expected_status), future in zip(UPLOAD_CASES, futures):
+        assert future.result() == expected_status, path
+
+
+_REPORT_FIELDS = (
+    "insights_version",
+    "collection_time",
+    "hardware",
+    "software",
+    "platform",
+    "source_metrics",
+)
+# Opted-out records have all report fields NULL
+_NULL_COND = " AND ".join(f"{field} IS NULL" for field in _REPORT_FIELDS)
+# Non-optout records have at least one report field set
+_NOT_NULL_COND = " OR ".join(f"{field} IS NOT NULL" for field in _REPORT_FIELDS)
 
 
 def test_db_state(juju: jubilant.Juju):
@@ -92,80 +99,74 @@ def test_db_state(juju: jubilant.Juju):
     task = juju.run("postgresql-k8s/0", "get-password", {"username": "operator"})
     db_pass = task.results["password"]
 
-    def run_query(query: str) -> str:
-        return juju.cli(
+    def run_counts(queries: dict[str, str]) -> dict[str, str]:
+        """Run named COUNT queries in a single psql call, returning the counts by name."""
+        combined = " UNION ALL ".join(
+            f"SELECT '{name}', ({query})" for name, query in queries.items()
+        )
+        output = juju.cli(
             "ssh",
             "--container",
             "postgresql",
             "postgresql-k8s/0",
             f'psql -h localhost -U operator \
               --password -d insights \
-              -t -c "{query}"',
+              -t -A -F"|" -c "{combined};"',
             stdin=db_pass + "\n",
         )
+        return dict(line.split("|", 1) for line in output.splitlines() if "|" in line)
 
     def count_query(table: str, optout: bool) -> str:
-        fields = [
-            "insights_version",
-            "collection_time",
-            "hardware",
-            "software",
-            "platform",
-            "source_metrics",
-        ]
-
         if optout:
-            # Create conditions checking that all fields are NULL
-            null_conditions = " AND ".join([f"{field} IS NULL" for field in fields])
-            return f"SELECT COUNT(*) FROM {table} WHERE optout = true AND ({null_conditions})"
-        else:
-            # For non-optout records, check that at least one field is NOT NULL
-            not_null_conditions = " OR ".join([f"{field} IS NOT NULL" for field in fields])
-            return f"SELECT COUNT(*) FROM {table} WHERE optout = false AND ({not_null_conditions})"
+            return f"SELECT COUNT(*) FROM {table} WHERE optout = true AND ({_NULL_COND})"
+        return f"SELECT COUNT(*) FROM {table} WHERE optout = false AND ({_NOT_NULL_COND})"
+
+    counts = run_counts(
+        {
+            "linux": "SELECT COUNT(*) FROM linux",
+            "linux_optout": count_query("linux", True),
+            "linux_non_optout": count_query("linux", False),
+            "ubuntu": "SELECT COUNT(*) FROM ubuntu_desktop_provision",
+            "ubuntu_optout": count_query("ubuntu_desktop_provision", True),
+            "ubuntu_non_optout": count_query("ubuntu_desktop_provision", False),
+            "ubuntu_report": "SELECT COUNT(*) FROM ubuntu_report",
+            "ubuntu_report_filtered": (
+                "SELECT COUNT(*) FROM ubuntu_report "
+                "WHERE optout = false "
+                "AND distribution = 'ubuntu' "
+                "AND version = '20.04'"
+            ),
+            "invalid": "SELECT COUNT(*) FROM invalid_reports",
+        }
+    )
 
     # Check contents of the linux table
-    linux_count = run_query("SELECT COUNT(*) FROM linux;")
-    linux_optout_count = run_query(count_query("linux", True))
-    linux_non_optout_count = run_query(count_query("linux", False))
-
-    assert linux_count.strip() == "3"
-    assert linux_optout_count.strip() == "1"
-    assert linux_non_optout_count.strip() == "2"
+    assert counts["linux"] == "3"
+    assert counts["linux_optout"] == "1"
+    assert counts["linux_non_optout"] == "2"
 
     # Check contents of the ubuntu_desktop_provision table
-    ubuntu_count = run_query("SELECT COUNT(*) FROM ubuntu_desktop_provision;")
-    ubuntu_optout_count = run_query(count_query("ubuntu_desktop_provision", True))
-    ubuntu_non_optout_count = run_query(count_query("ubuntu_desktop_provision", False))
-
-    assert ubuntu_count.strip() == "1"
-    assert ubuntu_optout_count.strip() == "0"
-    assert ubuntu_non_optout_count.strip() == "1"
+    assert counts["ubuntu"] == "1"
+    assert counts["ubuntu_optout"] == "0"
+    assert counts["ubuntu_non_optout"] == "1"
 
     # Check contents of ubuntu_report table
-    ubuntu_report_count = run_query("SELECT COUNT(*) FROM ubuntu_report;")
-    ubuntu_report_filtered_count = run_query(
-        "SELECT COUNT(*) FROM ubuntu_report "
-        "WHERE optout = false "
-        "AND distribution = 'ubuntu' "
-        "AND version = '20.04';"
-    )
-
-    assert ubuntu_report_count.strip() == "1"
-    assert ubuntu_report_filtered_count.strip() == "1"
+    assert counts["ubuntu_report"] == "1"
+    assert counts["ubuntu_report_filtered"] == "1"
 
     # Check the contents of invalid_reports
-    invalid_count = run_query("SELECT COUNT(*) FROM invalid_reports;")
-    assert invalid_count.strip() == "1"
+    assert counts["invalid"] == "1"
 
 
 def test_database_relations(
     app: str,
     juju: jubilant.Juju,
+    http: requests.Session,
     insights_address: str,
     requests_timeout: float,
 ):
     def ping_web_service():
-        response = requests.get(f"{insights_address}/version", timeout=requests_timeout)
+        response = http.get(f"{insights_address}/version", timeout=requests_timeout)
         return response.status_code == 200
 
     juju.wait(jubilant.all_active)
@@ -173,9 +174,13 @@ def test_database_relations(
 
     # Remove database relation
     juju.remove_relation(app, "postgresql-k8s:database")
-    juju.wait(jubilant.any_blocked)
+    juju.wait(
+        lambda status: (
+            jubilant.any_blocked(status, app) and jubilant.all_active(status, "postgresql-k8s")
+        ),
+        successes=5,
+    )
     assert ping_web_service()
-    juju.wait(lambda status: jubilant.all_active(status, "postgresql-k8s"), successes=5)
 
     # Re-add database relation
     juju.integrate(app, "postgresql-k8s:database")
@@ -186,8 +191,8 @@ def test_database_relations(
 def test_config_changed(
     app: str,
     juju: jubilant.Juju,
+    http: requests.Session,
     insights_address: str,
-    requests_timeout: float,
 ):
     """Check that the charm reacts to config changes."""
     juju.wait(jubilant.all_active)
@@ -195,15 +200,29 @@ def test_config_changed(
     # Change the config, ensure that the changes are applied
     juju.config(app, {"web-apps": "linux"})
 
-    juju.wait(
-        lambda status: requests.post(
+    polls = 0
+    rejections = 0
+
+    def windows_rejected(status: jubilant.Status) -> bool:
+        nonlocal polls, rejections
+        if not jubilant.all_active(status, app):
+            rejections = 0
+            return False
+        # Only hit the web service on every few status polls. Polls in between never succeed,
+        # the wait ends once enough consecutive probes were rejected.
+        polls += 1
+        if polls % HTTP_POLL_EVERY != 1:
+            return False
+        response = http.post(
             f"{insights_address}/upload/windows",
-            json=ExampleReport.OPT_OUT.value,
-            timeout=requests_timeout,
-        ).status_code
-        == 403
-        and jubilant.all_active(status, app)
-    )
+            data=ExampleReport.OPT_OUT.bytes,
+            headers=JSON_HEADERS,
+            timeout=HTTP_POLL_TIMEOUT,
+        )
+        rejections = rejections + 1 if response.status_code == 403 else 0
+        return rejections >= HTTP_POLL_SUCCESSES
+
+    juju.wait(windows_rejected, successes=1)
 
 
 def test_upgrade(
@@ -211,6 +230,7 @@ def test_upgrade(
     juju: jubilant.Juju,
     charm_file: str,
     image: str,
+    http: requests.Session,
     insights_address: str,
     requests_timeout: float,
 ):
@@ -222,7 +242,7 @@ def test_upgrade(
     }
 
     def ping_web_service():
-        response = requests.get(f"{insights_address}/version", timeout=requests_timeout)
+        response = http.get(f"{insights_address}/version", timeout=requests_timeout)
         return response.status_code == 200
 
     assert ping_web_service()
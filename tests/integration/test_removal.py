@@ -20,6 +20,7 @@ def test_active(juju: jubilant.Juju, app: str):
 def test_scale_down(
     juju: jubilant.Juju,
     app: str,
+    http: requests.Session,
     insights_address: str,
     requests_timeout: float,
 ):
@@ -29,13 +30,14 @@ def test_scale_down(
         lambda status: jubilant.all_active(status, app) and jubilant.all_agents_idle(status, app)
     )
 
-    response = requests.get(f"{insights_address}/version", timeout=requests_timeout)
+    response = http.get(f"{insights_address}/version", timeout=requests_timeout)
     assert response.status_code == 200
 
 
 def test_remove_application(
     juju: jubilant.Juju,
     app: str,
+    http: requests.Session,
     insights_address: str,
     requests_timeout: float,
 ):
@@ -44,7 +46,7 @@ def test_remove_application(
     juju.wait(lambda status: jubilant.all_active(status) and jubilant.all_agents_idle(status))
 
     try:
-        response = requests.get(f"{insights_address}/version", timeout=requests_timeout)
+        response = http.get(f"{insights_address}/version", timeout=requests_timeout)
         assert response.status_code == 404
     except (requests.Timeout, requests.ConnectionError):
         # Expected - application was removed, so connection should fail
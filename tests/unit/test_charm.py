@@ -4,20 +4,28 @@
 # Learn more about testing at: https://juju.is/docs/sdk/testing
 
 
+import dataclasses
 import json
 from enum import Enum
+from pathlib import Path
+from unittest.mock import patch
 
 import ops
+import pytest
+import yaml
 from ops import testing
 
 from charm import (
     CONTAINER_NAME,
     INGEST_ALLOWLIST_PATH,
     INGEST_PROMETHEUS_PORT,
+    LEGACY_VERSIONS,
+    MIGRATIONS_PATH,
     WEB_ALLOWLIST_PATH,
     WEB_PROMETHEUS_PORT,
     UbuntuInsightsCharm,
 )
+from charm import ServiceType as CharmServiceType
 
 
 class ServiceType(Enum):
@@ -28,10 +36,67 @@ class ServiceType(Enum):
 
 
 REPORTS_CACHE_MOUNT_LOCATION = "/var/lib/ubuntu-insights/"
+CHARMCRAFT_PATH = Path(__file__).parents[2] / "charmcraft.yaml"
+
+
+@pytest.fixture(scope="module")
+def charm_spec():
+    """Parse the charm metadata, config and actions once for the whole module."""
+    meta = yaml.safe_load(CHARMCRAFT_PATH.read_text())
+    return meta, meta.pop("config", None), meta.pop("actions", None)
+
+
+@pytest.fixture
+def ctx(charm_spec):
+    """Build a Context from the parsed charm spec.
+
+    A fresh Context is built for each test, since it records exec and event history across runs.
+    """
+    meta, config, actions = charm_spec
+    return testing.Context(UbuntuInsightsCharm, meta=meta, config=config, actions=actions)
+
+
+EXPECTED_PLAN = {
+    "services": {
+        ServiceType.WEB.value: {
+            "override": "replace",
+            "summary": "web service",
+            "command": (
+                f"/bin/ubuntu-insights-web-service "
+                f"{WEB_ALLOWLIST_PATH} "
+                f"--listen-port=8080 "
+                f"--reports-dir={REPORTS_CACHE_MOUNT_LOCATION} "
+                f"--metrics-port={WEB_PROMETHEUS_PORT} "
+                "--json-logs "
+                "-v"
+            ),
+            "startup": "enabled",
+        },
+        ServiceType.INGEST.value: {
+            "override": "replace",
+            "summary": "ingest service",
+            "command": (
+                f"/bin/ubuntu-insights-ingest-service "
+                f"{INGEST_ALLOWLIST_PATH} "
+                f"--reports-dir={REPORTS_CACHE_MOUNT_LOCATION} "
+                f"--metrics-port={INGEST_PROMETHEUS_PORT} "
+                f"--json-logs "
+                "-v"
+            ),
+            "startup": "disabled",
+        },
+    },
+    "checks": {
+        "web-service-ready": {
+            "override": "replace",
+            "level": "ready",
+            "http": {"url": "http://localhost:8080/version"},
+        },
+    },
+}
 
 
-def test_pebble_layer():
-    ctx = testing.Context(UbuntuInsightsCharm)
+def test_pebble_layer(ctx: testing.Context):
     container = testing.Container(name=CONTAINER_NAME, can_connect=True)
     state_in = testing.State(
         containers={container},
@@ -39,46 +104,7 @@ def test_pebble_layer():
     )
     state_out = ctx.run(ctx.on.pebble_ready(container), state_in)
 
-    expected_plan = {
-        "services": {
-            ServiceType.WEB.value: {
-                "override": "replace",
-                "summary": "web service",
-                "command": (
-                    f"/bin/ubuntu-insights-web-service "
-                    f"{WEB_ALLOWLIST_PATH} "
-                    f"--listen-port=8080 "
-                    f"--reports-dir={REPORTS_CACHE_MOUNT_LOCATION} "
-                    f"--metrics-port={WEB_PROMETHEUS_PORT} "
-                    "--json-logs "
-                    "-v"
-                ),
-                "startup": "enabled",
-            },
-            ServiceType.INGEST.value: {
-                "override": "replace",
-                "summary": "ingest service",
-                "command": (
-                    f"/bin/ubuntu-insights-ingest-service "
-                    f"{INGEST_ALLOWLIST_PATH} "
-                    f"--reports-dir={REPORTS_CACHE_MOUNT_LOCATION} "
-                    f"--metrics-port={INGEST_PROMETHEUS_PORT} "
-                    f"--json-logs "
-                    "-v"
-                ),
-                "startup": "disabled",
-            },
-        },
-        "checks": {
-            "web-service-ready": {
-                "override": "replace",
-                "level": "ready",
-                "http": {"url": "http://localhost:8080/version"},
-            },
-        },
-    }
-
-    assert state_out.get_container(container.name).plan == expected_plan
+    assert state_out.get_container(container.name).plan == EXPECTED_PLAN
 
     assert (
         state_out.get_container(container.name).service_statuses[ServiceType.WEB.value]
@@ -89,8 +115,7 @@ def test_pebble_layer():
     assert ServiceType.INGEST.value not in state_out.get_container(container.name).service_statuses
 
 
-def test_config_changed():
-    ctx = testing.Context(UbuntuInsightsCharm)
+def test_config_changed(ctx: testing.Context):
     container = testing.Container(name=CONTAINER_NAME, can_connect=True)
     state_in = testing.State(
         containers={container},
@@ -117,8 +142,8 @@ def test_config_changed():
     container_fs = state_out.get_container(container.name).get_filesystem(ctx)
     ingest_daemon_cfg_file = container_fs / INGEST_ALLOWLIST_PATH[1:]
     web_daemon_cfg_file = container_fs / WEB_ALLOWLIST_PATH[1:]
-    ingest_daemon_config = json.loads(ingest_daemon_cfg_file.read_text())
-    web_daemon_config = json.loads(web_daemon_cfg_file.read_text())
+    ingest_daemon_config = json.loads(ingest_daemon_cfg_file.read_bytes())
+    web_daemon_config = json.loads(web_daemon_cfg_file.read_bytes())
 
     assert "linux" in ingest_daemon_config["allowList"]
     assert "windows" in ingest_daemon_config["allowList"]
@@ -129,8 +154,159 @@ def test_config_changed():
     assert "ubuntu-report/ubuntu/desktop/24.04" in web_daemon_config["allowList"]
 
 
-def test_relation_data():
-    ctx = testing.Context(UbuntuInsightsCharm)
+def test_legacy_allowlist_is_stable(ctx: testing.Context):
+    container = testing.Container(name=CONTAINER_NAME, can_connect=True)
+    state_in = testing.State(
+        containers={container},
+        config={"web-apps": "linux", "web-legacy": True},
+        leader=True,
+    )
+    state_out = ctx.run(ctx.on.config_changed(), state_in)
+
+    container_fs = state_out.get_container(container.name).get_filesystem(ctx)
+    rendered = (container_fs / WEB_ALLOWLIST_PATH[1:]).read_text()
+
+    assert json.loads(rendered)["allowList"] == [
+        "linux",
+        *(f"ubuntu-report/ubuntu/desktop/{version}" for version in LEGACY_VERSIONS),
+    ]
+
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        charm = manager.charm
+        charm._reconcile()
+        assert charm._build_allowlist(CharmServiceType.WEB, charm.config) == (
+            WEB_ALLOWLIST_PATH,
+            rendered,
+        )
+
+
+def test_allowlist_push_skipped_when_unchanged(ctx: testing.Context):
+    container = testing.Container(name=CONTAINER_NAME, can_connect=True)
+    state_in = testing.State(containers={container}, leader=True)
+
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        charm = manager.charm
+        with patch.object(charm.container, "push") as push:
+            web = charm._build_allowlist(CharmServiceType.WEB, charm.config)
+            ingest = charm._build_allowlist(CharmServiceType.INGEST, charm.config)
+            charm._push_allowlists([web, ingest])
+            charm._push_allowlists([web, ingest])
+
+    assert push.call_count == 2
+
+
+def test_reconcile_skipped_when_unchanged(ctx: testing.Context):
+    container = testing.Container(name=CONTAINER_NAME, can_connect=True)
+    state_in = testing.State(containers={container}, leader=True)
+
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        charm = manager.charm
+        with patch.object(charm, "_push_allowlists") as push_allowlists:
+            charm._reconcile()
+            charm._reconcile()
+            assert push_allowlists.call_count == 1
+
+            charm._reconcile(force=True)
+            assert push_allowlists.call_count == 2
+
+
+def test_replan_skipped_when_plan_current(ctx: testing.Context):
+    container = testing.Container(name=CONTAINER_NAME, can_connect=True)
+    state_in = testing.State(containers={container}, leader=True)
+
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        charm = manager.charm
+        charm._reconcile(force=True)
+
+        # Drop the in-memory caches, so only the container state is compared.
+        charm._applied_layer = None
+        charm._pushed_allowlists.clear()
+        with (
+            patch.object(charm.container, "push") as push,
+            patch.object(charm.container, "add_layer") as add_layer,
+        ):
+            charm._reconcile(force=True)
+
+    push.assert_not_called()
+    add_layer.assert_not_called()
+
+
+def test_replan_when_field_removed(ctx: testing.Context):
+    container = testing.Container(name=CONTAINER_NAME, can_connect=True)
+    state_in = testing.State(containers={container}, leader=True)
+
+    with ctx(ctx.on.config_changed(), state_in) as manager:
+        charm = manager.charm
+        charm._reconcile(force=True)
+        # Copy the layer, the testing backend keeps and merges into the applied layer object.
+        layer = ops.pebble.Layer(
+            charm._build_pebble_layer(charm._layer_inputs(), dict(charm.config)).to_dict()
+        )
+        assert charm._is_plan_current(layer)
+
+        # The plan still holds credentials of a database that is no longer related.
+        stale_layer = {
+            "services": {
+                ServiceType.INGEST.value: {
+                    "override": "merge",
+                    "environment": {"UBUNTU_INSIGHTS_INGEST_SERVICE_DBCONFIG_HOST": "old"},
+                }
+            }
+        }
+        charm.container.add_layer(CONTAINER_NAME, stale_layer, combine=True)
+        assert not charm._is_plan_current(layer)
+
+
+def test_version_requested_once_service_running(ctx: testing.Context):
+    container = testing.Container(name=CONTAINER_NAME, can_connect=True)
+    state_in = testing.State(containers={container}, leader=True)
+
+    with ctx(ctx.on.update_status(), state_in) as manager:
+        charm = manager.charm
+        with patch.object(charm, "_request_version", return_value="1.0") as request_version:
+            # The web service is not in the plan yet.
+            assert charm.version == ""
+            request_version.assert_not_called()
+
+            charm._reconcile(force=True)
+            assert charm.version == "1.0"
+            assert charm.version == "1.0"
+            request_version.assert_called_once()
+
+
+def test_version_reported_when_plan_current(ctx: testing.Context, tmp_path: Path):
+    # Mount the allowlist directory, so the rendered allowlists persist across hooks.
+    allowlist_dir = str(Path(WEB_ALLOWLIST_PATH).parent)
+    container = testing.Container(
+        name=CONTAINER_NAME,
+        can_connect=True,
+        mounts={"allowlists": testing.Mount(location=allowlist_dir, source=tmp_path)},
+    )
+    state_in = testing.State(containers={container}, leader=True)
+
+    # The service is still starting up when the first hook asks for its version.
+    with patch.object(
+        UbuntuInsightsCharm, "_request_version", side_effect=ConnectionError("refused")
+    ):
+        state_out = ctx.run(ctx.on.pebble_ready(container), state_in)
+    assert state_out.workload_version == ""
+
+    # A later hook finds the plan current, but still reports the version.
+    container_out = state_out.get_container(container.name)
+    container = dataclasses.replace(
+        container, layers=container_out.layers, service_statuses=container_out.service_statuses
+    )
+    state_in = dataclasses.replace(state_in, containers={container})
+    with (
+        patch.object(UbuntuInsightsCharm, "_request_version", return_value="1.0"),
+        patch.object(ops.Container, "add_layer") as add_layer,
+    ):
+        state_out = ctx.run(ctx.on.config_changed(), state_in)
+    add_layer.assert_not_called()
+    assert state_out.workload_version == "1.0"
+
+
+def test_relation_data(ctx: testing.Context):
     relation = testing.Relation(
         endpoint="database",
         interface="postgresql_client",
@@ -162,8 +338,71 @@ def test_relation_data():
     }
 
 
-def test_database_relation_broken():
-    ctx = testing.Context(UbuntuInsightsCharm)
+def _migrations_state(migrations_dir, password="bar", migrate=True):
+    """State with a ready database relation and migration scripts mounted in the workload."""
+    relation = testing.Relation(
+        endpoint="database",
+        interface="postgresql_client",
+        remote_app_name="postgresql-k8s",
+        remote_app_data={
+            "endpoints": "example.com:5432",
+            "username": "foo",
+            "password": password,
+            "database": "insights",
+        },
+    )
+    container = testing.Container(
+        name=CONTAINER_NAME,
+        can_connect=True,
+        mounts={"migrations": testing.Mount(location=MIGRATIONS_PATH, source=migrations_dir)},
+        execs={
+            testing.Exec(
+                ["/bin/ubuntu-insights-ingest-service", "migrate", MIGRATIONS_PATH],
+                return_code=0,
+            )
+        },
+    )
+    return testing.State(
+        containers={container}, relations={relation}, config={"migrate": migrate}, leader=True
+    )
+
+
+def test_migrations_not_repeated(ctx: testing.Context, tmp_path: Path):
+    (tmp_path / "000001_init.up.sql").write_text("CREATE TABLE linux ();")
+    state_in = _migrations_state(tmp_path)
+
+    def rerun(state: testing.State, previous: testing.State) -> testing.State:
+        """Run config-changed on the state, carrying over the previous stored state."""
+        state = dataclasses.replace(state, stored_states=previous.stored_states)
+        return ctx.run(ctx.on.config_changed(), state)
+
+    state_out = ctx.run(ctx.on.config_changed(), state_in)
+    assert len(ctx.exec_history[CONTAINER_NAME]) == 1
+
+    # A later hook against the same database and scripts does not migrate again.
+    state_out = rerun(state_in, state_out)
+    assert len(ctx.exec_history[CONTAINER_NAME]) == 1
+
+    # New migration scripts are applied.
+    (tmp_path / "000002_report.up.sql").write_text("CREATE TABLE ubuntu_report ();")
+    state_out = rerun(state_in, state_out)
+    assert len(ctx.exec_history[CONTAINER_NAME]) == 2
+
+    # A recreated database at the same address is issued new credentials and is migrated.
+    rerun(_migrations_state(tmp_path, password="baz"), state_out)
+    assert len(ctx.exec_history[CONTAINER_NAME]) == 3
+
+
+def test_migrations_on_database_created(ctx: testing.Context, tmp_path: Path):
+    (tmp_path / "000001_init.up.sql").write_text("CREATE TABLE linux ();")
+    state_in = _migrations_state(tmp_path, migrate=False)
+
+    # A newly created database is always migrated, regardless of the migrate option.
+    ctx.run(ctx.on.relation_changed(next(iter(state_in.relations))), state_in)
+    assert len(ctx.exec_history[CONTAINER_NAME]) == 1
+
+
+def test_database_relation_broken(ctx: testing.Context):
     relation = testing.Relation(
         endpoint="database",
         interface="postgresql_client",
@@ -181,8 +420,7 @@ def test_database_relation_broken():
     assert state_out.unit_status == testing.BlockedStatus("Waiting for database relation")
 
 
-def test_no_database_blocked():
-    ctx = testing.Context(UbuntuInsightsCharm)
+def test_no_database_blocked(ctx: testing.Context):
     container = testing.Container(name=CONTAINER_NAME, can_connect=True)
     state_in = testing.State(
         containers={container},
@@ -194,8 +432,7 @@ def test_no_database_blocked():
     assert state_out.unit_status == testing.BlockedStatus("Waiting for database relation")
 
 
-def test_storage_attached():
-    ctx = testing.Context(UbuntuInsightsCharm)
+def test_storage_attached(ctx: testing.Context):
     storage = testing.Storage("reports-cache")
     container = testing.Container(name=CONTAINER_NAME, can_connect=True)
 
@@ -220,8 +457,7 @@ def test_storage_attached():
     )
 
 
-def test_open_port():
-    ctx = testing.Context(UbuntuInsightsCharm)
+def test_open_port(ctx: testing.Context):
     container = testing.Container(name=CONTAINER_NAME, can_connect=True)
 
     state_in = testing.State(
@@ -1,9 +1,9 @@
 # Copyright 2025 Canonical Ltd.
 # See LICENSE file for licensing details.
 
-import contextlib
-from unittest.mock import MagicMock, PropertyMock, patch
+from unittest.mock import MagicMock
 
+import pytest
 from ops.model import ModelError
 
 from database import DatabaseHandler, DBData
@@ -27,90 +27,106 @@ def test_get_relation_data_no_relation():
     assert handler.get_relation_data() == DBData()
 
 
-@contextlib.contextmanager
-def handler_with_mocked_relation(relation_data, relation_id=1):
+class _FakeRelation:
+    __slots__ = ("id",)
+
+    def __init__(self, relation_id):
+        self.id = relation_id
+
+
+class _FakeDatabase:
+    """Stand-in for DatabaseRequires exposing only what DatabaseHandler reads."""
+
+    __slots__ = ("relations", "relation_data", "fetch_count")
+
+    def __init__(self, relation_data, relation_id):
+        self.relations = [_FakeRelation(relation_id)]
+        self.relation_data = relation_data
+        self.fetch_count = 0
+
+    def fetch_relation_data(self):
+        self.fetch_count += 1
+        if isinstance(self.relation_data, Exception):
+            raise self.relation_data
+        return self.relation_data
+
+
+def handler_with_relation(relation_data, relation_id=1):
     charm = MagicMock()
     handler = DatabaseHandler(charm, "database")
     handler.model.get_relation = MagicMock(return_value=True)
-    with patch.object(
-        type(handler.database), "relations", new_callable=PropertyMock
-    ) as mock_relations:
-        mock_relations.return_value = [MagicMock(id=relation_id)]
-        handler.database.fetch_relation_data = MagicMock(return_value=relation_data)
-        yield handler
-
-
-def test_get_relation_data_no_endpoints():
-    """Test that get_relation_data returns empty DBData when no endpoints are found."""
-    with handler_with_mocked_relation({0: {}, 1: {"endpoints": ""}}, relation_id=0) as handler:
-        assert handler.get_relation_data() == DBData()
-
-    with handler_with_mocked_relation({1: {"endpoints": ""}}, relation_id=1) as handler:
-        assert handler.get_relation_data() == DBData()
-
-
-def test_get_relation_data_fetch_exception():
-    """Test empty return when fetch_relation_data raises exception."""
-    with handler_with_mocked_relation({}, relation_id=1) as handler:
-        handler.database.fetch_relation_data = MagicMock(
-            side_effect=ModelError("permission denied")
-        )
-        assert handler.get_relation_data() == DBData()
-
-
-def test_get_relation_data_malformed_endpoint():
-    """Test that get_relation_data returns empty DBData when endpoints are malformed."""
-    with handler_with_mocked_relation({1: {"endpoints": "badendpoint"}}, relation_id=1) as handler:
-        assert handler.get_relation_data() == DBData()
-
-
-def test_get_relation_data_missing_fields():
-    with handler_with_mocked_relation(
-        {
-            1: {
-                "endpoints": "host:1234",
-                "username": None,
-                "password": None,
-                "database": None,
-            }
-        },
-        relation_id=1,
-    ) as handler:
-        assert handler.get_relation_data() == DBData()
-
-
-def test_get_relation_data_valid():
-    """Test that get_relation_data returns valid DBData when all fields are present and valid."""
-    with handler_with_mocked_relation(
-        {
-            1: {
-                "endpoints": "host:1234",
-                "username": "user",
-                "password": "pass",
-                "database": "db",
-            }
-        },
-        relation_id=1,
-    ) as handler:
-        db = handler.get_relation_data()
-        assert db.host == "host"
-        assert db.port == "1234"
-        assert db.user == "user"
-        assert db.password == "pass"
-        assert db.db_name == "db"
-
-
-def test_is_relation_ready_true():
+    handler.database = _FakeDatabase(relation_data, relation_id)
+    return handler
+
+
+VALID_RELATION_DATA = {
+    "endpoints": "host:1234",
+    "username": "user",
+    "password": "pass",
+    "database": "db",
+}
+
+
+@pytest.mark.parametrize(
+    "relation_data,relation_id,expected",
+    [
+        pytest.param({0: {}, 1: {"endpoints": ""}}, 0, DBData(), id="no-endpoints-other-relation"),
+        pytest.param({1: {"endpoints": ""}}, 1, DBData(), id="no-endpoints"),
+        pytest.param(ModelError("permission denied"), 1, DBData(), id="fetch-exception"),
+        pytest.param({1: {"endpoints": "badendpoint"}}, 1, DBData(), id="malformed-endpoint"),
+        pytest.param(
+            {
+                1: {
+                    "endpoints": "host:1234",
+                    "username": None,
+                    "password": None,
+                    "database": None,
+                }
+            },
+            1,
+            DBData(),
+            id="missing-fields",
+        ),
+        pytest.param(
+            {1: VALID_RELATION_DATA},
+            1,
+            DBData(host="host", port="1234", user="user", password="pass", db_name="db"),
+            id="valid",
+        ),
+    ],
+)
+def test_get_relation_data(relation_data, relation_id, expected):
+    """Test that get_relation_data parses valid relation data and rejects anything else."""
+    handler = handler_with_relation(relation_data, relation_id=relation_id)
+    assert handler.get_relation_data() == expected
+
+
+def test_get_relation_data_cached():
+    """Test that relation data is only fetched once until the cache is invalidated."""
+    handler = handler_with_relation({1: VALID_RELATION_DATA}, relation_id=1)
+    first = handler.get_relation_data()
+    assert handler.get_relation_data() is first
+    assert handler.is_relation_ready()
+    assert handler.database.fetch_count == 1
+
+    handler.invalidate()
+    assert handler.get_relation_data() == first
+    assert handler.database.fetch_count == 2
+
+
+@pytest.fixture(scope="module")
+def handler():
+    """Build one handler shared by tests that stub out get_relation_data."""
+    return DatabaseHandler(MagicMock(), "database")
+
+
+def test_is_relation_ready_true(handler: DatabaseHandler, monkeypatch: pytest.MonkeyPatch):
     """Test that is_relation_ready returns True when relation data is valid."""
-    charm = MagicMock()
-    handler = DatabaseHandler(charm, "database")
-    handler.get_relation_data = MagicMock(return_value=DBData(host="host"))
+    monkeypatch.setattr(handler, "get_relation_data", lambda: DBData(host="host"))
     assert handler.is_relation_ready() is True
 
 
-def test_is_relation_ready_false():
+def test_is_relation_ready_false(handler: DatabaseHandler, monkeypatch: pytest.MonkeyPatch):
     """Test that is_relation_ready returns False when relation data is not valid."""
-    charm = MagicMock()
-    handler = DatabaseHandler(charm, "database")
-    handler.get_relation_data = MagicMock(return_value=DBData(host=""))
+    monkeypatch.setattr(handler, "get_relation_data", lambda: DBData(host=""))
     assert handler.is_relation_ready() is False